@@ -1,24 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import wx
 import cv2
 import numpy as np
 
-# --- Image Processing Functions ---
-
-def sharpen(img):
-    kernel = np.array([[0, -1, 0], [-1, 5,-1], [0, -1, 0]])
-    return cv2.filter2D(img, -1, kernel)
-
-def edge_detect(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    return cv2.Canny(gray, 100, 200)
+from filters import FrameCache, build_pyramid, frame_digest
 
-def blur(img):
-    return cv2.GaussianBlur(img, (15, 15), 0)
-
-def hist_eq(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    eq = cv2.equalizeHist(gray)
-    return cv2.cvtColor(eq, cv2.COLOR_GRAY2BGR)
+CACHE_BYTES = 1 << 30  # budget for cached intermediate frames
 
 # --- GUI Class ---
 class ImageProcessingGUI(wx.Frame):
@@ -26,8 +14,24 @@ class ImageProcessingGUI(wx.Frame):
         super().__init__(parent, title=title, size=(1000, 800),
                          style=wx.DEFAULT_FRAME_STYLE | wx.RESIZE_BORDER)
         self.original_img = None
-        self.proc_img = None
+        self.canvas = np.empty((340, 340, 3), dtype=np.uint8)
+
+        # Filters are applied to a downscaled preview right away and to the
+        # full-resolution image on a background worker, which posts the
+        # result back with wx.CallAfter. Both are rendered through the frame
+        # cache from the nearest cached ancestor of the current chain.
+        self.preview_src = None   # smallest pyramid level of original_img
+        self.source = None        # digest of original_img, part of every cache key
+        self.steps = []           # filter history, including steps that can be redone
+        self.cursor = 0           # number of steps currently applied
+        self.job_id = 0           # bumped for every new request; older jobs are stale
+        self.pending = None
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.cache = FrameCache(CACHE_BYTES)
+        self.closed = False
+
         self.setup_ui()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.Show()
 
     def setup_ui(self):
@@ -83,10 +87,18 @@ class ImageProcessingGUI(wx.Frame):
 
         sizer.Add(grid_sizer, 0, wx.ALL | wx.CENTER, 10)
 
-        # Back Button
+        # History Buttons
+        hist_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.undo_btn = wx.Button(panel, label="Undo")
+        self.undo_btn.Bind(wx.EVT_BUTTON, self.undo)
         self.back_btn = wx.Button(panel, label="Back to Original")
         self.back_btn.Bind(wx.EVT_BUTTON, self.back_to_original)
-        sizer.Add(self.back_btn, 0, wx.ALL | wx.CENTER, 10)
+        self.redo_btn = wx.Button(panel, label="Redo")
+        self.redo_btn.Bind(wx.EVT_BUTTON, self.redo)
+        for btn in (self.undo_btn, self.back_btn, self.redo_btn):
+            hist_sizer.Add(btn, 0, wx.ALL, 5)
+        sizer.Add(hist_sizer, 0, wx.ALL | wx.CENTER, 5)
+        self.update_history_buttons()
 
         panel.SetSizer(sizer)
 
@@ -98,18 +110,20 @@ class ImageProcessingGUI(wx.Frame):
     def display_image(self, img, bmp_widget):
         if img is None:
             return
-        img_bgr = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR) if len(img.shape) == 2 else img.copy()
-        h, w = img_bgr.shape[:2]
+        # Resize first and convert only the small result; FromBuffer copies the
+        # canvas, so one canvas is reused for every update
+        h, w = img.shape[:2]
         max_dim = 340
         aspect_ratio = w / h
         new_w, new_h = (max_dim, int(max_dim / aspect_ratio)) if aspect_ratio > 1 else (int(max_dim * aspect_ratio), max_dim)
-        resized = cv2.resize(img_bgr, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        canvas = np.full((340, 340, 3), 240, dtype=np.uint8)  # Light gray background
+        resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        code = cv2.COLOR_GRAY2RGB if len(img.shape) == 2 else cv2.COLOR_BGR2RGB
+        canvas = self.canvas
+        canvas.fill(240)  # Light gray background
         y_off = (340 - new_h) // 2
         x_off = (340 - new_w) // 2
-        canvas[y_off:y_off+new_h, x_off:x_off+new_w] = resized
-        rgb = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB)
-        bmp = wx.Bitmap.FromBuffer(340, 340, rgb)
+        canvas[y_off:y_off+new_h, x_off:x_off+new_w] = cv2.cvtColor(resized, code)
+        bmp = wx.Bitmap.FromBuffer(340, 340, canvas)
         bmp_widget.SetBitmap(bmp)
         self.panel.Layout()
 
@@ -122,51 +136,112 @@ class ImageProcessingGUI(wx.Frame):
                 img = cv2.imread(path)
                 if img is not None:
                     self.original_img = img
-                    self.proc_img = None
-                    self.display_image(self.original_img, self.before_bmp)
-                    self.display_image(self.original_img, self.after_bmp)
+                    self.preview_src = build_pyramid(img)[-1]
+                    self.source = frame_digest(img)
+                    self.cache.clear()  # frames of the previous image are no longer reachable
+                    self.steps, self.cursor = [], 0
+                    self.display_image(self.preview_src, self.before_bmp)
+                    self.show_step()
                 else:
                     wx.MessageBox("Failed to load image.", "Error")
 
-    def get_current_img(self):
-        return self.proc_img if self.proc_img is not None else self.original_img
+    def update_history_buttons(self):
+        self.undo_btn.Enable(self.cursor > 0)
+        self.back_btn.Enable(self.cursor > 0)
+        self.redo_btn.Enable(self.cursor < len(self.steps))
+
+    def show_step(self):
+        # Show the preview for steps[:cursor] now and queue the full-resolution frame
+        chain = tuple(self.steps[:self.cursor])
+        preview = self.cache.render((self.source, 'preview'), self.preview_src, chain)
+        self.display_image(preview, self.after_bmp)
+        self.update_history_buttons()
+
+        # A queued job is superseded by this one; a running one notices the
+        # new job_id and stops after its current filter, which stays cached.
+        if self.pending is not None:
+            self.pending.cancel()
+        self.job_id += 1
+        full = self.cache.get(((self.source, 'full'), chain)) if chain else self.original_img
+        if full is not None:
+            self.display_image(full, self.after_bmp)
+            return
+        self.pending = self.worker.submit(self.process_full, self.job_id, self.source,
+                                          self.original_img, chain)
+        self.pending.add_done_callback(self.full_done)
+
+    def process_full(self, job_id, source, original, chain):
+        # Runs on the worker thread
+        img = self.cache.render((source, 'full'), original, chain,
+                                should_stop=lambda: self.closed or job_id != self.job_id)
+        if img is not None and not self.closed:
+            wx.CallAfter(self.show_full, job_id, img)
+
+    def show_full(self, job_id, img):
+        # `not self` is true once wx has destroyed the frame
+        if self and job_id == self.job_id:
+            self.display_image(img, self.after_bmp)
+
+    def full_done(self, future):
+        # Runs on the worker thread; nothing else reads the future, so report
+        # a failed job here or its exception is lost
+        if future.cancelled() or self.closed:
+            return
+        error = future.exception()
+        if error is not None:
+            wx.CallAfter(self.show_error, error)
+
+    def show_error(self, error):
+        if self:
+            wx.MessageBox(f"Full-resolution processing failed: {error}", "Error")
 
     def back_to_original(self, event):
-        if self.original_img is not None:
-            self.proc_img = None
-            self.display_image(self.original_img, self.after_bmp)
-
-    def sharpen(self, event):
-        img = self.get_current_img()
-        if img is None:
+        # a step in the history like any other, so Redo can return from it
+        if self.original_img is not None and self.cursor > 0:
+            self.cursor = 0
+            self.show_step()
+
+    def undo(self, event):
+        if self.cursor > 0:
+            self.cursor -= 1
+            self.show_step()
+
+    def redo(self, event):
+        if self.cursor < len(self.steps):
+            self.cursor += 1
+            self.show_step()
+
+    def apply_filter(self, name):
+        if self.original_img is None:
             wx.MessageBox("Load an image first.", "Error")
             return
-        self.proc_img = sharpen(img)
-        self.display_image(self.proc_img, self.after_bmp)
+        chain = self.steps[:self.cursor] + [name]
+        try:
+            self.cache.render((self.source, 'preview'), self.preview_src, chain)
+        except cv2.error:
+            wx.MessageBox(f"Can't apply {name} to this image.", "Error")
+            return
+        self.steps, self.cursor = chain, len(chain)
+        self.show_step()
+
+    def on_close(self, event):
+        # the running job stops after its current filter; wait for it so
+        # nothing touches the frame once it is destroyed
+        self.closed = True
+        self.worker.shutdown(wait=True, cancel_futures=True)
+        event.Skip()
+
+    def sharpen(self, event):
+        self.apply_filter('sharpen')
 
     def edge_detect(self, event):
-        img = self.get_current_img()
-        if img is None:
-            wx.MessageBox("Load an image first.", "Error")
-            return
-        self.proc_img = edge_detect(img)
-        self.display_image(self.proc_img, self.after_bmp)
+        self.apply_filter('edge_detect')
 
     def blur(self, event):
-        img = self.get_current_img()
-        if img is None:
-            wx.MessageBox("Load an image first.", "Error")
-            return
-        self.proc_img = blur(img)
-        self.display_image(self.proc_img, self.after_bmp)
+        self.apply_filter('blur')
 
     def hist_eq(self, event):
-        img = self.get_current_img()
-        if img is None:
-            wx.MessageBox("Load an image first.", "Error")
-            return
-        self.proc_img = hist_eq(img)
-        self.display_image(self.proc_img, self.after_bmp)
+        self.apply_filter('hist_eq')
 
 # --- Run App ---
 if __name__ == '__main__':
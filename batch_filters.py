@@ -0,0 +1,166 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from compiler import positive_int
+from filters import FILTERS, FilterGraph
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+# --- Headless batch pipeline ---
+# The main process only hands out chunks of paths. Each worker process
+# overlaps I/O with compute: a reader thread prefetches cv2.imread results
+# into a bounded queue, the worker applies the filter chain, and writer
+# threads drain a second bounded queue with cv2.imwrite. OpenCV releases the
+# GIL in decode, encode and the filters, so the threads really run in parallel.
+# The chain runs through one FilterGraph per worker so its buffers are reused
+# for every image of the same size. Output frames go to the writers and come
+# back through a free list once written, so they are reused too.
+
+def parse_chain(text):
+    chain = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in chain if name not in FILTERS]
+    if unknown or not chain:
+        raise ValueError(f'Unknown filter(s) {unknown}; choose from {", ".join(FILTERS)}')
+    return chain
+
+def find_images(inputs):
+    # (path, root) pairs; outputs are written relative to root. Explicit
+    # files share one root so their relative layout is kept.
+    found, files = [], []
+    for p in inputs:
+        if os.path.isdir(p):
+            for dirpath, _, names in os.walk(p):
+                for f in sorted(names):
+                    if f.lower().endswith(IMAGE_EXTS):
+                        found.append((os.path.join(dirpath, f), p))
+        else:
+            files.append(p)
+    if files:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+        found += [(f, os.path.relpath(root)) for f in files]
+    return found
+
+def _reader(jobs, q):
+    try:
+        for src, dst in jobs:
+            try:
+                img = cv2.imread(src)
+            except cv2.error:
+                img = None
+            q.put((src, dst, img))
+    finally:
+        q.put(None)  # the worker waits for this, so always send it
+
+def _writer(q, free, written, errors):
+    while True:
+        item = q.get()
+        if item is None:
+            return
+        dst, img = item
+        try:
+            os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+            if cv2.imwrite(dst, img):
+                written.append(dst)
+            else:
+                errors.append((dst, 'failed to write image'))
+        except (OSError, cv2.error) as e:
+            errors.append((dst, str(e)))
+        free.put(img)
+
+def process_chunk(jobs, chain, prefetch=8, writers=2):
+    cv2.setNumThreads(1)  # one process per core already
+    read_q = queue.Queue(maxsize=prefetch)
+    write_q = queue.Queue(maxsize=prefetch)
+    free = queue.Queue()  # output frames the writers are done with
+    written, errors = [], []
+    graph = FilterGraph(chain)
+    reader = threading.Thread(target=_reader, args=(jobs, read_q), daemon=True)
+    reader.start()
+    writer_threads = [threading.Thread(target=_writer, args=(write_q, free, written, errors), daemon=True)
+                      for _ in range(writers)]
+    for t in writer_threads:
+        t.start()
+
+    while True:
+        item = read_q.get()
+        if item is None:
+            break
+        src, dst, img = item
+        if img is None:
+            errors.append((src, 'failed to read image'))
+            continue
+        try:
+            out = free.get_nowait() if not free.empty() else None
+            if out is None or out.shape != graph.result_shape(img):
+                out = graph.new_output(img)
+            graph.run(img, out=out)
+        except cv2.error as e:
+            errors.append((src, str(e).strip()))
+            continue
+        write_q.put((dst, out))
+
+    for _ in writer_threads:
+        write_q.put(None)
+    for t in writer_threads:
+        t.join()
+    return len(written), errors, graph.stats()
+
+def run_batch(inputs, out_dir, chain, jobs=None, chunk_size=64, prefetch=8, writers=2):
+    work, errors, claimed = [], [], {}
+    for src, root in find_images(inputs):
+        dst = os.path.join(out_dir, os.path.relpath(src, root or '.'))
+        key = os.path.abspath(dst)
+        if key in claimed:
+            if claimed[key] != os.path.abspath(src):
+                errors.append((src, f'output {dst} is also written for {claimed[key]}'))
+            continue
+        claimed[key] = os.path.abspath(src)
+        work.append((src, dst))
+    chunks = [work[i:i + chunk_size] for i in range(0, len(work), chunk_size)]
+
+    start = time.perf_counter()
+    done, saved = 0, 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(process_chunk, c, chain, prefetch, writers) for c in chunks]
+        for fut in as_completed(futures):
+            n, errs, graph_stats = fut.result()
+            done += n
+            errors += errs
+            saved += graph_stats['allocations_saved']
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    return {'images': done, 'errors': errors, 'seconds': elapsed, 'images_per_s': done / elapsed,
+            'allocations_saved': saved}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Apply a filter chain to many images in parallel.')
+    ap.add_argument('inputs', nargs='+', help='image files or directories')
+    ap.add_argument('-o', '--out-dir', required=True, help='where processed images are written')
+    ap.add_argument('-c', '--chain', required=True,
+                    help=f'comma-separated filters, e.g. sharpen,blur ({", ".join(FILTERS)})')
+    ap.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count(), help='worker processes')
+    ap.add_argument('--chunk-size', type=positive_int, default=64, help='images handed to a worker at a time')
+    ap.add_argument('--prefetch', type=positive_int, default=8, help='read/write queue depth per worker')
+    ap.add_argument('--writers', type=positive_int, default=2, help='writer threads per worker')
+    args = ap.parse_args(argv)
+    try:
+        chain = parse_chain(args.chain)
+    except ValueError as e:
+        ap.error(str(e))
+
+    stats = run_batch(args.inputs, args.out_dir, chain, args.jobs,
+                      args.chunk_size, args.prefetch, args.writers)
+    for path, err in stats['errors']:
+        print(f'{path}: {err}', file=sys.stderr)
+    print(f"{stats['images']} images, {len(stats['errors'])} errors in {stats['seconds']:.2f}s")
+    print(f"{stats['images_per_s']:.1f} images/s, {stats['allocations_saved']} frame allocations saved")
+    return 1 if stats['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
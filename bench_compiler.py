@@ -0,0 +1,119 @@
+import argparse
+import random
+import re
+import time
+
+from compiler import CodeGen, Parser, PrattParser, tokenize
+
+# --- Reference regex tokenizer (the one the DFA scanner replaced) ---
+
+# Token specification
+spec = [
+    ('NUMBER', r'\d+(\.\d+)?'),
+    ('ID', r'[A-Za-z_]\w*'),
+    ('OP', r'==|!=|<=|>=|<|>|[+\-*/=!]'),
+    ('KEYWORD', r'\b(if|then|else)\b'),
+    ('SKIP', r'[ \t]+'),
+    ('LPAREN', r'\$\$'),
+    ('RPAREN', r'\$\$'),
+    ('NEWLINE', r'\n'),
+    ('MISMATCH', r'.'),
+]
+
+tok_re = re.compile('|'.join(f'(?P<{n}>{p})' for n, p in spec))
+
+def tokenize_regex(code):
+    tokens = []
+    for m in tok_re.finditer(code):
+        kind = m.lastgroup
+        val = m.group()
+        if kind == 'NUMBER':
+            val = float(val) if '.' in val else int(val)
+            tokens.append(('NUM', val))
+        elif kind == 'ID':
+            if val in ('if', 'then', 'else'):
+                tokens.append(('KEYWORD', val))
+            else:
+                tokens.append(('ID', val))
+        elif kind == 'OP':
+            tokens.append(('OP', val))
+        elif kind == 'KEYWORD':
+            tokens.append(('KEYWORD', val))
+        elif kind in ('LPAREN', 'RPAREN'):
+            tokens.append((kind, val))
+        elif kind in ('NEWLINE', 'SKIP'):
+            continue
+        else:
+            raise RuntimeError(f'Unexpected {val}')
+    return tokens
+
+# --- Input generation ---
+
+def make_program(n_tokens, seed=0):
+    rng = random.Random(seed)
+    ops = ['+', '-', '*', '/', '<', '==']
+    names = ['a', 'b', 'c', 'x', 'y', 'z']
+    lines, count = [], 0
+
+    def expr(n):
+        parts = [rng.choice(names + ['1', '2.5'])]
+        for _ in range(n):
+            parts += [rng.choice(ops), rng.choice(names + ['3', '4'])]
+        return ' '.join(parts)
+
+    while count < n_tokens:
+        n = rng.randint(1, 8)
+        if rng.random() < 0.2:
+            lines.append(f'if {expr(1)} then {rng.choice(names)} = {expr(n)} else {rng.choice(names)} = {expr(1)}')
+            count += 4 + 3 + 2 * n + 1 + 2 + 3 + 2
+        else:
+            lines.append(f'{rng.choice(names)} = {expr(n)}')
+            count += 3 + 2 * n
+    return '\n'.join(lines)
+
+# --- Benchmarks ---
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_lexer(code, repeat):
+    mb = len(code.encode()) / 1e6
+    print(f'{mb:.1f} MB source, best of {repeat}')
+    for name, fn in [('regex tokenize', tokenize_regex), ('DFA tokenize', tokenize)]:
+        t = best_of(lambda: fn(code), repeat)
+        print(f'  {name:<30} {t:8.3f}s  {mb / t:6.2f} MB/s')
+
+def bench_parser(tokens, repeat):
+    n = len(tokens)
+
+    def old():
+        cg = CodeGen()
+        cg.generate(Parser(tokens).parse_all())
+
+    def new():
+        cg = CodeGen()
+        cg.generate_flat(PrattParser(tokens).parse_all())
+
+    rows = [
+        ('Parser parse', best_of(lambda: Parser(tokens).parse_all(), repeat)),
+        ('PrattParser parse', best_of(lambda: PrattParser(tokens).parse_all(), repeat)),
+        ('Parser + generate', best_of(old, repeat)),
+        ('PrattParser + generate_flat', best_of(new, repeat)),
+    ]
+    print(f'{n} tokens, best of {repeat}')
+    for name, t in rows:
+        print(f'  {name:<30} {t:8.3f}s  {n / t / 1e6:6.2f} Mtok/s')
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Compiler pipeline benchmarks.')
+    ap.add_argument('-n', '--tokens', type=int, default=1_000_000)
+    ap.add_argument('-r', '--repeat', type=int, default=3)
+    args = ap.parse_args()
+    code = make_program(args.tokens)
+    bench_lexer(code, args.repeat)
+    bench_parser(tokenize(code), args.repeat)
@@ -1,44 +1,122 @@
-import re
-
-# Token specification
-spec = [
-    ('NUMBER', r'\d+(\.\d+)?'),
-    ('ID', r'[A-Za-z_]\w*'),
-    ('OP', r'==|!=|<=|>=|<|>|[+\-*/=!]'),
-    ('KEYWORD', r'\b(if|then|else)\b'),
-    ('SKIP', r'[ \t]+'),
-    ('LPAREN', r'\$\$'),
-    ('RPAREN', r'\$\$'),
-    ('NEWLINE', r'\n'),
-    ('MISMATCH', r'.'),
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# --- DFA scanner ---
+# Characters are mapped to a class through a lookup table, then a DFA over
+# those classes finds the longest token. The DFA is hand-derived from the
+# regex token spec the scanner replaced (kept in bench_compiler.py as the
+# baseline); each transition below is annotated with the rule it implements.
+# States are stored pre-multiplied by the class count so a transition is a
+# single list lookup.
+
+T_NUM, T_ID, T_OP, T_KEYWORD, T_LPAREN, T_RPAREN = range(6)
+TOKEN_NAMES = ('NUM', 'ID', 'OP', 'KEYWORD', 'LPAREN', 'RPAREN')
+KEYWORDS = frozenset(('if', 'then', 'else'))
+
+(C_DIGIT, C_ALPHA, C_WORD, C_DOT, C_EQ, C_BANG, C_CMP, C_ARITH,
+ C_SPACE, C_DOLLAR, C_NEWLINE, C_OTHER) = range(12)
+N_CLASSES = 12
+
+def _char_class(ch):
+    if ch.isascii():
+        if ch.isdigit(): return C_DIGIT
+        if ch.isalpha() or ch == '_': return C_ALPHA
+        return {'.': C_DOT, '=': C_EQ, '!': C_BANG, '<': C_CMP, '>': C_CMP,
+                '+': C_ARITH, '-': C_ARITH, '*': C_ARITH, '/': C_ARITH,
+                ' ': C_SPACE, '\t': C_SPACE, '$': C_DOLLAR, '\n': C_NEWLINE}.get(ch, C_OTHER)
+    # \d and \w are Unicode-aware in the regex spec; only ASCII letters may start an ID
+    if ch.isdecimal(): return C_DIGIT
+    if ch.isalnum(): return C_WORD
+    return C_OTHER
+
+_ASCII_CLASSES = bytes(_char_class(chr(o)) for o in range(128))
+
+(S_START, S_INT, S_DOT, S_FRAC, S_ID, S_OP1, S_OP2, S_SKIP,
+ S_DOLLAR, S_PAREN, S_NEWLINE, S_BAD) = [n * N_CLASSES for n in range(12)]
+
+_transitions = [
+    (S_START, (C_DIGIT,), S_INT),                 # NUMBER  \d+(\.\d+)?
+    (S_INT, (C_DIGIT,), S_INT),
+    (S_INT, (C_DOT,), S_DOT),
+    (S_DOT, (C_DIGIT,), S_FRAC),
+    (S_FRAC, (C_DIGIT,), S_FRAC),
+    (S_START, (C_ALPHA,), S_ID),                  # ID      [A-Za-z_]\w*
+    (S_ID, (C_DIGIT, C_ALPHA, C_WORD), S_ID),
+    (S_START, (C_EQ, C_BANG, C_CMP), S_OP1),      # OP      ==|!=|<=|>=|<|>|[+\-*/=!]
+    (S_OP1, (C_EQ,), S_OP2),
+    (S_START, (C_ARITH,), S_OP2),
+    (S_START, (C_SPACE,), S_SKIP),                # SKIP    [ \t]+
+    (S_SKIP, (C_SPACE,), S_SKIP),
+    (S_START, (C_DOLLAR,), S_DOLLAR),             # LPAREN  \$\$ (RPAREN is shadowed by it)
+    (S_DOLLAR, (C_DOLLAR,), S_PAREN),
+    (S_START, (C_NEWLINE,), S_NEWLINE),           # NEWLINE \n
+    (S_START, (C_DOT, C_WORD, C_OTHER), S_BAD),   # MISMATCH .
 ]
+_delta = [-1] * (12 * N_CLASSES)
+for _src, _classes, _dst in _transitions:
+    for _c in _classes:
+        _delta[_src + _c] = _dst
 
-tok_re = re.compile('|'.join(f'(?P<{n}>{p})' for n, p in spec))
+_OPERATORS = {op: op for op in ('==', '!=', '<=', '>=', '<', '>', '+', '-', '*', '/', '=', '!')}
 
-def tokenize(code):
-    tokens = []
-    for m in tok_re.finditer(code):
-        kind = m.lastgroup
-        val = m.group()
-        if kind == 'NUMBER':
-            val = float(val) if '.' in val else int(val)
-            tokens.append(('NUM', val))
-        elif kind == 'ID':
-            if val in ('if', 'then', 'else'):
-                tokens.append(('KEYWORD', val))
-            else:
-                tokens.append(('ID', val))
-        elif kind == 'OP':
-            tokens.append(('OP', val))
-        elif kind == 'KEYWORD':
-            tokens.append(('KEYWORD', val))
-        elif kind in ('LPAREN', 'RPAREN'):
-            tokens.append((kind, val))
-        elif kind in ('NEWLINE', 'SKIP'):
+def scan(code):
+    # Returns parallel sequences of integer token kinds and token values.
+    if code.isascii():
+        classes = code.encode('ascii').translate(_ASCII_CLASSES + bytes(128))
+    else:
+        classes = bytes(_char_class(ch) for ch in code)
+    kinds, vals = array('B'), []
+    add_kind, add_val = kinds.append, vals.append
+    delta = _delta
+    interned = {}  # per call, so a long-lived process does not keep every name
+    i, n = 0, len(code)
+    while i < n:
+        s, j = S_START, i
+        while j < n:
+            t = delta[s + classes[j]]
+            if t < 0:
+                break
+            s, j = t, j + 1
+        if s == S_SKIP or s == S_NEWLINE:
+            i = j
             continue
+        if s == S_DOT:  # '1.' is NUMBER '1' followed by '.'
+            s, j = S_INT, j - 1
+        val = code[i:j]
+        i = j
+        if s == S_ID:
+            name = interned.get(val)
+            if name is None:
+                name = interned[val] = sys.intern(val)
+            add_kind(T_KEYWORD if name in KEYWORDS else T_ID)
+            add_val(name)
+        elif s == S_INT:
+            add_kind(T_NUM)
+            add_val(int(val))
+        elif s == S_FRAC:
+            add_kind(T_NUM)
+            add_val(float(val))
+        elif s == S_OP1 or s == S_OP2:
+            add_kind(T_OP)
+            add_val(_OPERATORS[val])
+        elif s == S_PAREN:
+            add_kind(T_LPAREN)
+            add_val('$$')
         else:
             raise RuntimeError(f'Unexpected {val}')
-    return tokens
+    return kinds, vals
+
+def tokenize(code):
+    kinds, vals = scan(code)
+    names = TOKEN_NAMES
+    return [(names[k], v) for k, v in zip(kinds, vals)]
 
 class Parser:
     def __init__(self, tks): self.tks, self.i = tks, 0
@@ -139,6 +217,184 @@ class Parser:
             stmts.append(self.parse_statement())
         return stmts
 
+# --- Flat AST ---
+# Nodes live in parallel arrays indexed by node id. Children are always created
+# before their parent, so every subtree is laid out in post-order.
+
+NUM, VAR, BINOP, ASSIGN, IF = range(5)
+
+class FlatAST:
+    __slots__ = ('kind', 'val', 'a', 'b', 'c', 'roots')
+
+    def __init__(self):
+        self.kind = array('B')  # node kind
+        self.val = []           # number, variable name or operator
+        self.a = array('l')     # binop left / assign expr / if cond
+        self.b = array('l')     # binop right / if then
+        self.c = array('l')     # if else, -1 when absent
+        self.roots = []         # top-level statement ids
+
+    def __len__(self): return len(self.kind)
+
+    def add(self, kind, val=None, a=-1, b=-1, c=-1):
+        self.kind.append(kind)
+        self.val.append(val)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        return len(self.kind) - 1
+
+    def to_tuples(self, node):
+        # Same shape as Parser's output; iterative so deep trees are fine.
+        done = {}
+        stack = [node]
+        while stack:
+            n = stack[-1]
+            k = self.kind[n]
+            kids = [x for x in (self.a[n], self.b[n], self.c[n]) if x >= 0 and x not in done]
+            if kids:
+                stack.extend(kids)
+                continue
+            stack.pop()
+            if k == NUM: done[n] = ('num', self.val[n])
+            elif k == VAR: done[n] = ('var', self.val[n])
+            elif k == BINOP: done[n] = ('binop', self.val[n], done[self.a[n]], done[self.b[n]])
+            elif k == ASSIGN: done[n] = ('assign', self.val[n], done[self.a[n]])
+            else: done[n] = ('if', done[self.a[n]], done[self.b[n]], done.get(self.c[n]))
+        return done[node]
+
+# --- Precedence-climbing parser ---
+
+BINARY_PREC = {'==': 1, '!=': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+               '+': 2, '-': 2, '*': 3, '/': 3}
+_PAREN = None  # operator-stack marker for an open paren
+
+class PrattParser:
+    # Accepts the same language as Parser but keeps its own frame stack
+    # instead of recursing, so nesting depth is bounded only by memory.
+    def __init__(self, tks):
+        self.tks, self.i = tks, 0
+        self.ast = FlatAST()
+
+    def peek(self): return self.tks[self.i] if self.i < len(self.tks) else None
+    def consume(self, *types):
+        t = self.peek()
+        if t and t[0] in types:
+            self.i += 1
+            return t
+        raise RuntimeError(f'Expected {types}, got {t}')
+
+    def parse_all(self):
+        while self.i < len(self.tks):
+            self.ast.roots.append(self.parse_statement())
+        return self.ast
+
+    def parse_statement(self):
+        # Frames: ['assign', var], ['if', stage, cond, then], ['expr', operands, ops]
+        ast = self.ast
+        frames = []
+        want_stmt = True
+        while True:
+            if want_stmt:
+                t = self.peek()
+                if t and t[0]=='ID':
+                    self.consume('ID')
+                    self.consume('OP')  # '='
+                    frames.append(['assign', t[1]])
+                elif t and t[0]=='KEYWORD' and t[1]=='if':
+                    self.consume('KEYWORD')
+                    frames.append(['if', 0, -1, -1])
+                else:
+                    raise RuntimeError(f'Unknown statement {t}')
+                frames.append(['expr', [], []])
+                want_stmt = False
+
+            node = self._climb(frames[-1], frames)
+            if node is None:
+                continue  # an 'if' primary was pushed; parse its condition first
+
+            # Hand the finished node to the frames waiting on it
+            while True:
+                frames.pop()
+                if not frames:
+                    return node
+                f = frames[-1]
+                if f[0]=='expr':
+                    f[1].append(node)
+                    break
+                if f[0]=='assign':
+                    node = ast.add(ASSIGN, f[1], node)
+                    continue
+                if f[1]==0:
+                    f[1], f[2] = 1, node
+                    self.consume('KEYWORD')  # 'then'
+                    want_stmt = True
+                    break
+                if f[1]==1:
+                    f[3] = node
+                    t = self.peek()
+                    if t and t[0]=='KEYWORD' and t[1]=='else':
+                        self.consume('KEYWORD')
+                        f[1] = 2
+                        want_stmt = True
+                        break
+                    node = ast.add(IF, None, f[2], node)
+                    continue
+                node = ast.add(IF, None, f[2], f[3], node)
+
+    def _climb(self, frame, frames):
+        # Runs the expression in `frame` until it ends (returns its node id) or
+        # hits an 'if' primary (pushes the frames for it and returns None).
+        ast = self.ast
+        operands, ops = frame[1], frame[2]
+        need_operand = len(operands) == len(ops) - ops.count(_PAREN)
+        while True:
+            t = self.peek()
+            if need_operand:
+                if not t:
+                    raise RuntimeError('Unexpected EOF')
+                kind = t[0]
+                if kind=='NUM':
+                    operands.append(ast.add(NUM, t[1]))
+                elif kind=='ID':
+                    operands.append(ast.add(VAR, t[1]))
+                elif kind=='LPAREN':
+                    ops.append(_PAREN)
+                    self.i += 1
+                    continue
+                elif kind=='KEYWORD' and t[1]=='if':
+                    self.consume('KEYWORD')
+                    frames.append(['if', 0, -1, -1])
+                    frames.append(['expr', [], []])
+                    return None
+                else:
+                    raise RuntimeError(f'Unexpected token {t}')
+                self.i += 1
+                need_operand = False
+                continue
+
+            prec = BINARY_PREC.get(t[1]) if t and t[0]=='OP' else None
+            if prec is not None:
+                while ops and ops[-1] is not _PAREN and BINARY_PREC[ops[-1]] >= prec:
+                    self._reduce(operands, ops)
+                ops.append(t[1])
+                self.i += 1
+                need_operand = True
+                continue
+            while ops and ops[-1] is not _PAREN:
+                self._reduce(operands, ops)
+            if not ops:
+                return operands[0]
+            self.consume('RPAREN')
+            ops.pop()
+
+    def _reduce(self, operands, ops):
+        r = operands.pop()
+        operands[-1] = self.ast.add(BINOP, ops.pop(), operands[-1], r)
+
+LOADS = {NUM: 'LOAD_CONST', VAR: 'LOAD'}
+ARITH_OPS = {'+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV'}
+
 class CodeGen:
     def __init__(self):
         self.vars = {}
@@ -197,6 +453,66 @@ class CodeGen:
         for s in stmts:
             self.gen_stmt(s)
 
+    def generate_flat(self, ast):
+        # Emits exactly what generate() would for the equivalent tuple AST.
+        # Every subtree occupies a contiguous run of node ids in post-order,
+        # so an expression's code comes from a straight scan over its ids: a
+        # leaf loads a new register, a binop pops two. Each statement on the
+        # work stack carries the first id of its run, where its expression
+        # starts. An if in operand position emits nothing in gen_expr, so the
+        # rare expression holding one is handed to gen_expr. LABEL/JMP lines
+        # still to come wait on the work stack as strings.
+        kind, val, a, b, c = ast.kind, ast.val, ast.a, ast.b, ast.c
+        kinds = kind.tobytes()
+        code = self.code
+        count = self.reg_count
+        lo = 0
+        for root in ast.roots:
+            work = [(root, lo)]
+            lo = root + 1
+            while work:
+                item = work.pop()
+                if isinstance(item, str):
+                    code.append(item)
+                    continue
+                s, first = item
+                e = a[s]
+                if kinds.find(IF, first, e + 1) >= 0:
+                    self.reg_count = count
+                    reg = self.gen_expr(ast.to_tuples(e))
+                    count = self.reg_count
+                else:
+                    regs = []
+                    for k, v in zip(kinds[first:e + 1], val[first:e + 1]):
+                        count += 1
+                        reg = f'R{count}'
+                        if k==BINOP:
+                            r = regs.pop()
+                            l = regs.pop()
+                            if v in ARITH_OPS:
+                                code.append(f'{ARITH_OPS[v]} {l} {r} -> {reg}')
+                            else:
+                                code.append(f'CMP {l} {r}')
+                                code.append(f'SET {reg} based on {v}')
+                        else:
+                            code.append(f'{LOADS[k]} {v} -> {reg}')
+                        regs.append(reg)
+
+                if kind[s]==ASSIGN:
+                    code.append(f'STORE {reg} -> {val[s]}')
+                    self.vars[val[s]] = reg
+                    continue
+                lbl_else = self.new_label()
+                lbl_end = self.new_label()
+                code.append(f'JZ {reg} {lbl_else}')
+                work.append(f'LABEL {lbl_end}')
+                if c[s] >= 0:
+                    work.append((c[s], b[s] + 1))
+                work.append(f'LABEL {lbl_else}')
+                work.append(f'JMP {lbl_end}')
+                work.append((b[s], e + 1))
+        self.reg_count = count
+
 def main():
     print("Enter code lines. Type 'END' to finish.")
     lines = []
@@ -213,19 +529,19 @@ def main():
         print(t)
     
     # Step 2: Parsing
-    parser = Parser(tokens)
+    parser = PrattParser(tokens)
     try:
-        stmts = parser.parse_all()
+        ast = parser.parse_all()
         print("\nParsed AST:")
         from pprint import pprint
-        pprint(stmts)
+        pprint([ast.to_tuples(s) for s in ast.roots])
     except RuntimeError as e:
         print('Parse error:', e)
         return
     
     # Step 3: Code Generation
     cg = CodeGen()
-    cg.generate(stmts)
+    cg.generate_flat(ast)
     print("\nGenerated Assembly:")
     for line in cg.code:
         print(line)
@@ -233,5 +549,191 @@ def main():
     for var, reg in cg.vars.items():
         print(f"{var} -> {reg}")
 
+# --- Profiling ---
+# Each phase records wall time and, with tracemalloc, the bytes allocated
+# during it (peak and net) relative to where the phase started. Tracing
+# slows allocation-heavy phases several times over, so it is off by default
+# and wall times from a traced run are not the phases' real cost.
+
+def compile_profiled(code, trace_malloc=False):
+    report = {'pid': os.getpid(), 'phases': []}
+    started_tracing = trace_malloc and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    def run(name, fn, *args):
+        if trace_malloc:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter_ns()
+        result = fn(*args)
+        t1 = time.perf_counter_ns()
+        phase = {'name': name, 'ts_us': t0 / 1e3, 'wall_ms': (t1 - t0) / 1e6}
+        if trace_malloc:
+            current, peak = tracemalloc.get_traced_memory()
+            phase['alloc_peak'] = peak - base
+            phase['alloc_net'] = current - base
+        report['phases'].append(phase)
+        return result, phase
+
+    try:
+        tokens, phase = run('tokenize', tokenize, code)
+        phase['tokens'] = len(tokens)
+        ast, phase = run('parse', lambda: PrattParser(tokens).parse_all())
+        phase['nodes'] = len(ast)
+        cg = CodeGen()
+        _, phase = run('codegen', cg.generate_flat, ast)
+        phase['instructions'] = len(cg.code)
+        phase['registers'] = cg.reg_count
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    report.update(tokens=len(tokens), nodes=len(ast), instructions=len(cg.code),
+                  registers=cg.reg_count,
+                  wall_ms=sum(p['wall_ms'] for p in report['phases']))
+    if trace_malloc:
+        report['alloc_peak'] = max(p['alloc_peak'] for p in report['phases'])
+    return tokens, cg, report
+
+def write_chrome_trace(reports, path):
+    # reports: (label, report) pairs; one complete event per phase, one row per process
+    events = []
+    for label, report in reports:
+        phases = report['phases']
+        start = phases[0]['ts_us']
+        end = phases[-1]['ts_us'] + phases[-1]['wall_ms'] * 1e3
+        common = {'cat': 'compile', 'ph': 'X', 'pid': report['pid'], 'tid': 0}
+        events.append(dict(common, name=label, ts=start, dur=end - start,
+                           args={k: v for k, v in report.items() if k not in ('phases', 'pid')}))
+        for p in phases:
+            events.append(dict(common, name=p['name'], ts=p['ts_us'], dur=p['wall_ms'] * 1e3,
+                               args={k: v for k, v in p.items() if k not in ('name', 'ts_us')}))
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# --- Batch mode ---
+
+def compile_source(code):
+    tokens = tokenize(code)
+    ast = PrattParser(tokens).parse_all()
+    cg = CodeGen()
+    cg.generate_flat(ast)
+    return tokens, cg
+
+def compile_file(job):
+    src, out, profile, trace_malloc = job
+    report = None
+    try:
+        with open(src, encoding='utf-8') as f:
+            code = f.read()
+        if profile:
+            tokens, cg, report = compile_profiled(code, trace_malloc)
+        else:
+            tokens, cg = compile_source(code)
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(cg.code) + '\n')
+    except (OSError, ValueError, RuntimeError) as e:  # ValueError covers bad UTF-8
+        return src, 0, str(e), None
+    return src, len(tokens), None, report
+
+def find_sources(paths, ext):
+    # (source, root) pairs; root is the directory the output path is made relative to.
+    # Files and glob matches share one root so their relative layout is kept.
+    found, files = [], []
+    for p in paths:
+        if os.path.isdir(p):
+            for f in sorted(glob.glob(os.path.join(p, '**', '*' + ext), recursive=True)):
+                found.append((f, p))
+        else:
+            files += sorted(glob.glob(p)) or [p]
+    if files:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+        found += [(f, os.path.relpath(root)) for f in files]
+    return found
+
+def output_path(src, root, out_dir):
+    base = os.path.splitext(src)[0] + '.asm'
+    if out_dir is None:
+        return base
+    return os.path.join(out_dir, os.path.relpath(base, root or '.'))
+
+def up_to_date(src, out):
+    try:
+        return os.path.getmtime(out) >= os.path.getmtime(src)
+    except OSError:
+        return False
+
+def positive_int(text):
+    n = int(text)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {n}')
+    return n
+
+def batch_main(argv=None):
+    ap = argparse.ArgumentParser(description='Compile source files to assembly in parallel.')
+    ap.add_argument('paths', nargs='+', help='source files, directories or glob patterns')
+    ap.add_argument('-o', '--out-dir', help='write .asm files here instead of next to the sources')
+    ap.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count(), help='worker processes')
+    ap.add_argument('--ext', default='.src', help='source extension searched for in directories')
+    ap.add_argument('-f', '--force', action='store_true', help='recompile up-to-date files')
+    ap.add_argument('--profile', action='store_true', help='print per-phase wall time')
+    ap.add_argument('--trace', metavar='JSON', help='write a Chrome trace-event file (implies --profile)')
+    ap.add_argument('--trace-malloc', action='store_true',
+                    help='also record per-phase allocations with tracemalloc (implies --profile; '
+                         'slows the timed phases)')
+    args = ap.parse_args(argv)
+    profile = args.profile or args.trace is not None or args.trace_malloc
+
+    jobs, skipped, errors, claimed = [], 0, 0, {}
+    for src, root in find_sources(args.paths, args.ext):
+        out = output_path(src, root, args.out_dir)
+        key = os.path.abspath(out)
+        if key in claimed:
+            if claimed[key] != os.path.abspath(src):
+                errors += 1
+                print(f'{src}: output {out} is also written for {claimed[key]}', file=sys.stderr)
+            continue
+        claimed[key] = os.path.abspath(src)
+        if not args.force and up_to_date(src, out):
+            skipped += 1
+        else:
+            jobs.append((src, out, profile, args.trace_malloc))
+
+    start = time.perf_counter()
+    n_tokens, failed, reports = 0, 0, []
+    if jobs:
+        chunk = max(1, len(jobs) // (args.jobs * 8))
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            for src, n, err, report in pool.map(compile_file, jobs, chunksize=chunk):
+                n_tokens += n
+                if err:
+                    failed += 1
+                    print(f'{src}: {err}', file=sys.stderr)
+                if report:
+                    reports.append((src, report))
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    done = len(jobs) - failed
+    errors += failed
+    print(f'{done} compiled, {skipped} up to date, {errors} errors in {elapsed:.2f}s')
+    print(f'{done / elapsed:.1f} files/s, {n_tokens / elapsed:.0f} tokens/s')
+    if reports:
+        totals = {}
+        for _, report in reports:
+            for p in report['phases']:
+                t = totals.setdefault(p['name'], [0.0, 0])
+                t[0] += p['wall_ms']
+                t[1] = max(t[1], p.get('alloc_peak', 0))
+        for name, (wall, peak) in totals.items():
+            alloc = f'  peak alloc {peak / 1024:.0f} KiB' if args.trace_malloc else ''
+            print(f'  {name:<10} {wall:10.1f} ms{alloc}')
+    if args.trace and reports:
+        write_chrome_trace(reports, args.trace)
+    return 1 if errors else 0
+
 if __name__=='__main__': 
+    if len(sys.argv) > 1:
+        sys.exit(batch_main())
     main()
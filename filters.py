@@ -0,0 +1,373 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# --- Image Processing Functions ---
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5,-1], [0, -1, 0]])
+
+def sharpen(img):
+    return cv2.filter2D(img, -1, SHARPEN_KERNEL)
+
+def edge_detect(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.Canny(gray, 100, 200)
+
+def blur(img):
+    return cv2.GaussianBlur(img, (15, 15), 0)
+
+def hist_eq(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    eq = cv2.equalizeHist(gray)
+    return cv2.cvtColor(eq, cv2.COLOR_GRAY2BGR)
+
+FILTERS = {
+    'sharpen': sharpen,
+    'edge_detect': edge_detect,
+    'blur': blur,
+    'hist_eq': hist_eq,
+}
+
+# --- Fused filter graph ---
+# Runs a whole chain into pre-allocated ping-pong buffers with dst= so that,
+# once planned for an image size, a run allocates no full-size frames.
+# hist_eq's output stays single-channel: its three BGR channels would be
+# identical, sharpen and blur work per channel, and BGR2GRAY of a replicated
+# gray image is exact, so the GRAY2BGR/BGR2GRAY round trip is dropped and the
+# expansion to BGR happens once at the end, only if the chain needs it.
+
+# full-size frames each standalone function allocates per call
+NAIVE_ALLOCATIONS = {'sharpen': 1, 'edge_detect': 2, 'blur': 1, 'hist_eq': 3}
+
+class FilterGraph:
+    def __init__(self, chain):
+        unknown = [name for name in chain if name not in FILTERS]
+        if unknown:
+            raise ValueError(f'Unknown filter(s) {unknown}')
+        self.chain = list(chain)
+        self.key = None
+        self.steps = []         # (fn, channels, slot); buffers are allocated on first use
+        self.buffers = {}
+        self.runs = 0
+        self.allocations = 0
+
+    def _shape(self, channels):
+        h, w = self.key[0][:2]
+        return (h, w) if channels == 1 else (h, w, channels)
+
+    def _buffer(self, channels, slot):
+        buf = self.buffers.get((channels, slot))
+        if buf is None:
+            buf = self.buffers[(channels, slot)] = np.empty(self._shape(channels), np.uint8)
+            self.allocations += 1
+        return buf
+
+    def _plan(self, img):
+        self.key = (img.shape, img.dtype)
+        self.buffers = {}
+        steps = []
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        as_bgr = channels != 1  # whether the caller expects 3 channels back
+        current = None          # (channels, slot) of the current frame, None = input
+
+        def add(fn, ch):
+            # write into the ping-pong buffer that does not hold the current frame
+            nonlocal current
+            slot = 1 - current[1] if current and current[0] == ch else 0
+            steps.append((fn, ch, slot))
+            current = (ch, slot)
+
+        for name in self.chain:
+            if name == 'sharpen':
+                add(lambda src, dst: cv2.filter2D(src, -1, SHARPEN_KERNEL, dst=dst), channels)
+                continue
+            if name == 'blur':
+                add(lambda src, dst: cv2.GaussianBlur(src, (15, 15), 0, dst=dst), channels)
+                continue
+            if channels != 1:
+                channels = 1
+                add(lambda src, dst: cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst), 1)
+            if name == 'edge_detect':
+                add(lambda src, dst: cv2.Canny(src, 100, 200, edges=dst), 1)
+                as_bgr = False
+            else:
+                add(lambda src, dst: cv2.equalizeHist(src, dst=dst), 1)
+                as_bgr = True
+
+        if as_bgr and channels == 1:
+            add(lambda src, dst: cv2.cvtColor(src, cv2.COLOR_GRAY2BGR, dst=dst), 3)
+        self.steps = steps
+
+    def result_shape(self, img):
+        if (img.shape, img.dtype) != self.key:
+            self._plan(img)
+        return self._shape(self.steps[-1][1]) if self.steps else img.shape
+
+    def new_output(self, img):
+        # A caller-owned array the final step can write into via run(out=...);
+        # counted as an allocation of the graph.
+        self.allocations += 1
+        return np.empty(self.result_shape(img), np.uint8)
+
+    def run(self, img, out=None):
+        # Without out the result is one of the graph's buffers and is
+        # overwritten by the next run.
+        if (img.shape, img.dtype) != self.key:
+            self._plan(img)
+        last = len(self.steps) - 1
+        frame = img
+        for i, (fn, channels, slot) in enumerate(self.steps):
+            dst = out if i == last and out is not None else self._buffer(channels, slot)
+            frame = fn(frame, dst)
+        if out is not None and last < 0:
+            np.copyto(out, img)
+            frame = out
+        self.runs += 1
+        return frame
+
+    def stats(self):
+        naive = self.runs * sum(NAIVE_ALLOCATIONS[name] for name in self.chain)
+        return {'runs': self.runs, 'allocations': self.allocations,
+                'naive_allocations': naive, 'allocations_saved': naive - self.allocations}
+
+# --- Preview pyramid ---
+
+def build_pyramid(img, min_size=340):
+    # Halves with pyrDown while the next level still covers min_size on its
+    # longer side; levels[-1] is the smallest and is what previews run on.
+    levels = [img]
+    while max(levels[-1].shape[:2]) // 2 >= min_size:
+        levels.append(cv2.pyrDown(levels[-1]))
+    return levels
+
+# --- Tiled processing ---
+# For images that do not fit in memory: src and dst can be np.memmap'd raw
+# buffers, and only one tile plus its halo is held in RAM at a time. The halo
+# is each kernel's reach, so results match whole-image processing exactly;
+# tiles on the image border see the same border handling as a full run.
+#   sharpen      3x3 kernel            -> 1 px
+#   blur         15x15 Gaussian        -> 7 px
+#   edge_detect  3x3 Sobel + 3x3 NMS   -> 2 px, then a hysteresis pass
+#   hist_eq      global histogram pass, then a per-tile LUT
+# Canny's hysteresis links edges across any distance, so edge_detect first
+# stores candidate (> low) and strong (> high) edge pixels per tile and then
+# grows the strong ones through connected candidates: components are labelled
+# per tile, joined across tile borders with a union-find, and every component
+# that reaches a strong pixel is written out in a second pass.
+
+HALO = {'sharpen': 1, 'blur': 7, 'edge_detect': 2}
+
+def open_raw(path, shape, mode='r'):
+    # raw interleaved 8-bit pixels, e.g. written by ndarray.tofile()
+    return np.memmap(path, dtype=np.uint8, mode=mode, shape=shape)
+
+def output_shape(name, shape):
+    if name == 'edge_detect':
+        return shape[:2]
+    if name == 'hist_eq':
+        return shape[:2] + (3,)
+    return shape
+
+def _tiles(h, w, tile):
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            yield y, min(y + tile, h), x, min(x + tile, w)
+
+def _window(src, y0, y1, x0, x1, halo):
+    # tile plus halo, clipped to the image; returns it and the core's slice in it
+    h, w = src.shape[:2]
+    wy0, wx0 = max(y0 - halo, 0), max(x0 - halo, 0)
+    win = np.ascontiguousarray(src[wy0:min(y1 + halo, h), wx0:min(x1 + halo, w)])
+    return win, (slice(y0 - wy0, y1 - wy0), slice(x0 - wx0, x1 - wx0))
+
+def _gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def _tiled_edges(src, dst, tile, workdir):
+    h, w = src.shape[:2]
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        cand = np.memmap(os.path.join(tmp, 'cand'), dtype=np.uint8, mode='w+', shape=(h, w))
+        for y0, y1, x0, x1 in _tiles(h, w, tile):
+            win, core = _window(src, y0, y1, x0, x1, HALO['edge_detect'])
+            gray = _gray(win)
+            cand[y0:y1, x0:x1] = cv2.Canny(gray, 100, 100)[core]
+            dst[y0:y1, x0:x1] = cv2.Canny(gray, 200, 200)[core]
+
+        # label candidate components per tile, giving each tile's labels a
+        # global offset, and keep every tile's border labels
+        grid = list(_tiles(h, w, tile))
+        offsets, borders, strong = [], {}, set()
+        total = 0
+        for y0, y1, x0, x1 in grid:
+            n, labels = cv2.connectedComponents(np.ascontiguousarray(cand[y0:y1, x0:x1]), connectivity=8)
+            g = np.where(labels > 0, labels + total, 0)
+            offsets.append(total)
+            borders[y0, x0] = g[0], g[-1], g[:, 0], g[:, -1]
+            strong.update(np.unique(g[dst[y0:y1, x0:x1] > 0]).tolist())
+            total += n - 1
+
+        # union labels that touch across tile borders (8-connected)
+        parent = {}
+        def find(i):
+            root = i
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while i != root:
+                parent[i], i = root, parent.get(i, i)
+            return root
+        pairs = []
+        for y0, y1, x0, x1 in grid:
+            top, bottom, left, right = borders[y0, x0]
+            if (y0, x1) in borders:  # right neighbour
+                other = borders[y0, x1][2]
+                pairs += [(right, other), (right[1:], other[:-1]), (right[:-1], other[1:])]
+            if (y1, x0) in borders:  # neighbour below
+                other = borders[y1, x0][0]
+                pairs += [(bottom, other), (bottom[1:], other[:-1]), (bottom[:-1], other[1:])]
+            if (y1, x1) in borders:  # diagonal below right
+                pairs.append((bottom[-1:], borders[y1, x1][0][:1]))
+            if (y1, x0 - tile) in borders:  # diagonal below left
+                pairs.append((bottom[:1], borders[y1, x0 - tile][0][-1:]))
+        links = [np.stack([p, q], 1)[(p > 0) & (q > 0)] for p, q in pairs]
+        if links:
+            for i, j in np.unique(np.concatenate(links), axis=0).tolist():
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[ri] = rj
+        linked_roots = {find(i) for i in strong}
+
+        for (y0, y1, x0, x1), offset in zip(grid, offsets):
+            c = np.ascontiguousarray(cand[y0:y1, x0:x1])
+            if not c.any():
+                continue
+            n, labels = cv2.connectedComponents(c, connectivity=8)
+            linked = np.array([False] + [find(offset + i) in linked_roots for i in range(1, n)])
+            dst[y0:y1, x0:x1][linked[labels]] = 255
+        del cand
+
+def _equalize_lut(hist, total):
+    # the table cv2.equalizeHist builds, in the same float32 arithmetic
+    lut = np.zeros(256, np.uint8)
+    first = int(np.flatnonzero(hist)[0])
+    if hist[first] == total:
+        lut[:] = first
+        return lut
+    scale = np.float32(255) / np.float32(total - int(hist[first]))
+    sums = np.cumsum(hist[first + 1:], dtype=np.int64)
+    lut[first + 1:] = np.rint(sums.astype(np.float32) * scale).clip(0, 255)
+    return lut
+
+def _tiled_hist_eq(src, dst, tile):
+    h, w = src.shape[:2]
+    hist = np.zeros(256, np.int64)
+    for y0, y1, x0, x1 in _tiles(h, w, tile):
+        hist += np.bincount(_gray(src[y0:y1, x0:x1]).ravel(), minlength=256)
+    lut = _equalize_lut(hist, h * w)
+    for y0, y1, x0, x1 in _tiles(h, w, tile):
+        eq = cv2.LUT(_gray(src[y0:y1, x0:x1]), lut)
+        dst[y0:y1, x0:x1] = cv2.cvtColor(eq, cv2.COLOR_GRAY2BGR)
+
+def tiled_filter(name, src, dst, tile=1024, workdir=None):
+    # dst must already have output_shape(name, src.shape)
+    if dst.shape != output_shape(name, src.shape):
+        raise ValueError(f'{name} needs an output of shape {output_shape(name, src.shape)}, got {dst.shape}')
+    h, w = src.shape[:2]
+    if name == 'edge_detect':
+        _tiled_edges(src, dst, tile, workdir)
+    elif name == 'hist_eq':
+        _tiled_hist_eq(src, dst, tile)
+    else:
+        fn = FILTERS[name]
+        for y0, y1, x0, x1 in _tiles(h, w, tile):
+            win, core = _window(src, y0, y1, x0, x1, HALO[name])
+            dst[y0:y1, x0:x1] = fn(win)[core]
+    return dst
+
+def tiled_chain(chain, src, dst, tile=1024, workdir=None):
+    # intermediate frames are memory-mapped temporary files in workdir
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for i, name in enumerate(chain):
+            if i == len(chain) - 1:
+                out = dst
+            else:
+                shape = output_shape(name, src.shape)
+                out = np.memmap(os.path.join(tmp, f'step{i}'), dtype=np.uint8, mode='w+', shape=shape)
+            tiled_filter(name, src, out, tile, workdir)
+            src = out
+    return dst
+
+# --- Frame cache ---
+# Intermediate results keyed by (source, filter chain prefix), evicted least
+# recently used first once their total size passes the byte budget. A chain
+# is rendered from its nearest cached ancestor, so an evicted frame is
+# recomputed from the closest frame that is still around.
+
+def frame_digest(img):
+    h = hashlib.blake2b(np.ascontiguousarray(img), digest_size=16)
+    h.update(repr((img.shape, img.dtype.str)).encode())
+    return h.hexdigest()
+
+class FrameCache:
+    def __init__(self, budget=1 << 30):
+        self.budget = budget
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.generation = 0  # bumped by clear()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.frames.move_to_end(key)
+            return frame
+
+    def put(self, key, frame, generation=None):
+        # frames rendered before the last clear() are dropped
+        if frame.nbytes > self.budget:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self.frames.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.frames[key] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.budget:
+                _, evicted = self.frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+            self.generation += 1
+
+    def nearest(self, source, steps):
+        # longest cached prefix of steps: (its length, frame), or (0, None)
+        for k in range(len(steps), 0, -1):
+            frame = self.get((source, tuple(steps[:k])))
+            if frame is not None:
+                return k, frame
+        return 0, None
+
+    def render(self, source, original, steps, should_stop=None):
+        # Frame for original with steps applied, caching every new
+        # intermediate. Returns None if should_stop() turns true between steps.
+        steps = tuple(steps)
+        generation = self.generation
+        k, img = self.nearest(source, steps)
+        if img is None:
+            img = original
+        for i in range(k, len(steps)):
+            if should_stop is not None and should_stop():
+                return None
+            img = FILTERS[steps[i]](img)
+            self.put((source, steps[:i + 1]), img, generation)
+        return img